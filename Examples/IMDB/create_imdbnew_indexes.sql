@@ -0,0 +1,5 @@
+use imdbnew;
+
+-- IMDBArtistResource looks artists up with primary_name like 'prefix%'; this index
+-- turns that into a range scan.
+create index idx_names_basic_primary_name on names_basic(primary_name(32));
@@ -7,3 +7,5 @@ load data local infile 'title_crew.tsv' into table title_crew fields terminated
 load data local infile 'title_episode.tsv' into table title_episodes fields terminated by '\t' ignore 1 rows;
 load data local infile 'title_principals.tsv' into table title_principals fields terminated by '\t' ignore 1 rows;
 
+
+create index idx_name_basics_primaryName on name_basics(primaryName(32));
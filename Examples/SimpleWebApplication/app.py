@@ -1,12 +1,15 @@
-from flask import Flask, Response
+from flask import Flask, Response, request
 import database_services.RDBService as d_service
 from flask_cors import CORS
-import json
+from flask_compress import Compress
+import orjson
+import hashlib
 
 from application_services.imdb_artists_resource import IMDBArtistResource
 
 app = Flask(__name__)
 CORS(app)
+Compress(app)
 
 
 @app.route('/')
@@ -17,14 +20,52 @@ def hello_world():
 @app.route('/imdb/artists/<prefix>')
 def get_artists_by_prefix(prefix):
     res = IMDBArtistResource.get_by_name_prefix(prefix)
-    rsp = Response(json.dumps(res), status=200, content_type="application/json")
+    rsp = Response(orjson.dumps(res, option=orjson.OPT_NON_STR_KEYS), status=200,
+                   content_type="application/json")
     return rsp
 
 
+# Upper bound on the rows a single prefix request can return.
+MAX_PREFIX_ROWS = 10000
+
+
+def _rows_to_json(batches):
+    yield b"["
+    sep = b""
+    for rows in batches:
+        yield sep + b",".join(orjson.dumps(r, option=orjson.OPT_NON_STR_KEYS) for r in rows)
+        sep = b","
+    yield b"]"
+
+
 @app.route('/<db_schema>/<table_name>/<column_name>/<prefix>')
 def get_by_prefix(db_schema, table_name, column_name, prefix):
-    res = d_service.get_by_prefix(db_schema, table_name, column_name, prefix)
-    rsp = Response(json.dumps(res), status=200, content_type="application/json")
+    limit = request.args.get("limit", default=MAX_PREFIX_ROWS, type=int)
+    limit = max(0, min(limit, MAX_PREFIX_ROWS))
+
+    try:
+        version = d_service.get_table_version(db_schema, table_name)
+    except ValueError as e:
+        return Response(str(e), status=404, content_type="text/plain")
+
+    # The weak ETag covers the query and the table version, so a client that already
+    # has the rows is answered without running the prefix query, and a reloaded or
+    # modified table gets a new ETag.
+    key = "/".join([db_schema, table_name, column_name, prefix]) + "?limit=" + str(limit) + \
+        "#" + version
+    etag = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        rsp = Response(status=304)
+        rsp.set_etag(etag, weak=True)
+        return rsp
+
+    try:
+        batches = d_service.stream_by_prefix(db_schema, table_name, column_name, prefix,
+                                             limit=limit)
+    except ValueError as e:
+        return Response(str(e), status=404, content_type="text/plain")
+    rsp = Response(_rows_to_json(batches), status=200, content_type="application/json")
+    rsp.set_etag(etag, weak=True)
     return rsp
 
 
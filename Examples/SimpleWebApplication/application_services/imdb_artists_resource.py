@@ -10,5 +10,6 @@ class IMDBArtistResource(BaseApplicationResource):
     @classmethod
     def get_by_name_prefix(cls, name_prefix):
         res = d_service.get_by_prefix("imdbnew", "names_basic",
-                                      "primary_name", name_prefix)
+                                      "primary_name", name_prefix,
+                                      fields=["nconst", "primary_name"])
         return res
\ No newline at end of file
@@ -1,32 +1,235 @@
 import pymysql
-import json
+import threading
+
+from cachetools import TTLCache, cached
+from dbutils.pooled_db import PooledDB
+
+
+# How long a cached prefix result may be served after it was read from the
+# database, e.g. after the table has been reloaded.
+CACHE_TTL_SECONDS = 300
+
+
+_db_args = dict(
+    user="dbuser",
+    password="dbuserdbuser",
+    cursorclass=pymysql.cursors.DictCursor,
+    host="localhost",
+    port=3306
+)
+
+
+def _session_settings():
+    """
+    MySQL 8 serves table create and update times from a stats cache for up to a day,
+    which would hide reloads from get_table_version. Turn that off for every pooled
+    connection, on servers that have the setting.
+    """
+    conn = pymysql.connect(**_db_args)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("select @@information_schema_stats_expiry")
+    except pymysql.err.MySQLError as e:
+        # 1193 is an unknown variable, i.e. a server without that cache.
+        if e.args[0] != 1193:
+            raise
+        return []
+    finally:
+        conn.close()
+
+    return ["set session information_schema_stats_expiry = 0"]
+
+
+# Connecting to MySQL costs a TCP handshake plus authentication, so connections
+# are opened once and handed out from a pool. Calling close() on a pooled
+# connection returns it to the pool instead of closing the socket. The session
+# settings are applied once, when each connection is opened.
+_pool = PooledDB(
+    pymysql,
+    mincached=2,
+    maxcached=10,
+    setsession=_session_settings(),
+    **_db_args
+)
 
 
 def _get_db_connection():
 
-    _db_connection = pymysql.connect(
-        user="dbuser",
-        password="dbuserdbuser",
-        cursorclass=pymysql.cursors.DictCursor,
-        host="localhost",
-        port=3306
-    )
+    _db_connection = _pool.connection()
 
     return _db_connection
 
 
-def get_by_prefix(db_schema, table_name, column_name, value_prefix):
+# (schema, table, column) triples that are known to exist and have been checked
+# for an index.
+_prefix_columns = set()
+
+# (schema, table, fields) triples whose fields are known to exist.
+_checked_fields = set()
+
+
+def _quote_ident(name):
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prepare_prefix_column(cur, db_schema, table_name, column_name):
+    """
+    Schema, table and column names come straight from the URL, so check that the
+    column exists before its name goes into SQL. Indexes are created by the load
+    scripts, not here; a column without one only gets a warning, because
+    like 'prefix%' on it will scan the whole table.
+    """
+    key = (db_schema, table_name, column_name)
+    if key in _prefix_columns:
+        return
+
+    cur.execute("select column_name as column_name from information_schema.columns " +
+                "where table_schema=%s and table_name=%s and column_name=%s",
+                key)
+    if cur.fetchone() is None:
+        raise ValueError("No column " + db_schema + "." + table_name + "." + column_name)
+
+    cur.execute("select index_name from information_schema.statistics " +
+                "where table_schema=%s and table_name=%s and column_name=%s " +
+                "and seq_in_index=1",
+                key)
+    if cur.fetchone() is None:
+        print("Warning: no index on " + db_schema + "." + table_name + "." + column_name +
+              ", prefix queries on it are full table scans.")
+
+    _prefix_columns.add(key)
+
+
+def _check_fields(cur, db_schema, table_name, fields):
+
+    key = (db_schema, table_name, fields)
+    if key in _checked_fields:
+        return
+
+    cur.execute("select column_name as column_name from information_schema.columns " +
+                "where table_schema=%s and table_name=%s",
+                (db_schema, table_name))
+    columns = {r["column_name"] for r in cur.fetchall()}
+    missing = [f for f in fields if f not in columns]
+    if missing:
+        raise ValueError("No column(s) " + ", ".join(missing) + " in " +
+                         db_schema + "." + table_name)
 
+    _checked_fields.add(key)
+
+
+def get_table_version(db_schema, table_name):
+    """
+    A string that changes whenever the table is recreated or its rows change, taken
+    from the create and update times MySQL keeps for the table.
+    """
     conn = _get_db_connection()
-    cur = conn.cursor()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("select create_time as create_time, update_time as update_time " +
+                        "from information_schema.tables " +
+                        "where table_schema=%s and table_name=%s",
+                        (db_schema, table_name))
+            res = cur.fetchone()
+    finally:
+        conn.close()
+
+    if res is None:
+        raise ValueError("No table " + db_schema + "." + table_name)
+
+    return str(res["create_time"]) + "/" + str(res["update_time"])
+
+
+def _prefix_query(cur, db_schema, table_name, column_name, value_prefix, fields=None,
+                  limit=None):
+
+    _prepare_prefix_column(cur, db_schema, table_name, column_name)
+
+    if fields:
+        fields = tuple(fields)
+        _check_fields(cur, db_schema, table_name, fields)
+        col_sql = ",".join(map(_quote_ident, fields))
+    else:
+        col_sql = "*"
+
+    sql = "select " + col_sql + " from " + \
+        _quote_ident(db_schema) + "." + _quote_ident(table_name) + \
+        " where " + _quote_ident(column_name) + " like %s"
+    args = (_escape_like(value_prefix) + "%",)
+
+    if limit is not None:
+        sql += " limit %s"
+        args += (limit,)
+
+    return sql, args
+
 
-    sql = "select * from " + db_schema + "." + table_name + " where " + \
-        column_name + " like " + "'" + value_prefix + "%'"
-    print("SQL Statement = " + cur.mogrify(sql, None))
+def get_by_prefix(db_schema, table_name, column_name, value_prefix, fields=None, limit=100):
+    """
+    Rows whose column_name starts with value_prefix. Only the columns in fields are
+    returned (all columns if fields is None), and at most limit rows.
+    """
+    fields = tuple(fields) if fields else None
 
-    res = cur.execute(sql)
-    res = cur.fetchall()
+    return _get_by_prefix(db_schema, table_name, column_name, value_prefix, fields, limit)
 
-    conn.close()
+
+# Autocomplete style lookups repeat the same prefixes over and over, so the
+# rows are kept in process for CACHE_TTL_SECONDS. The row dicts are shared by
+# everyone who hits the same entry, so callers must not modify them.
+@cached(TTLCache(maxsize=4096, ttl=CACHE_TTL_SECONDS), lock=threading.Lock())
+def _get_by_prefix(db_schema, table_name, column_name, value_prefix, fields, limit):
+
+    conn = _get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            sql, args = _prefix_query(cur, db_schema, table_name, column_name, value_prefix,
+                                      fields, limit)
+            print("SQL Statement = " + cur.mogrify(sql, args))
+
+            res = cur.execute(sql, args)
+            res = tuple(cur.fetchall())
+    finally:
+        conn.close()
 
     return res
+
+
+def stream_by_prefix(db_schema, table_name, column_name, value_prefix, fields=None,
+                     limit=None, batch_size=1000):
+    """
+    Same query as get_by_prefix, but returns a generator of row batches read from an
+    unbuffered server side cursor. Memory use is bounded by batch_size instead of by
+    the size of the result. Unlike get_by_prefix, the default limit is None, i.e. all
+    matching rows. The column is checked here, before anything is streamed.
+    """
+    conn = _get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            sql, args = _prefix_query(cur, db_schema, table_name, column_name, value_prefix,
+                                      fields, limit)
+    except Exception:
+        conn.close()
+        raise
+
+    return _stream_rows(conn, sql, args, batch_size)
+
+
+def _stream_rows(conn, sql, args, batch_size):
+
+    try:
+        with conn.cursor(pymysql.cursors.SSDictCursor) as cur:
+            print("SQL Statement = " + cur.mogrify(sql, args))
+            cur.execute(sql, args)
+
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+    finally:
+        conn.close()
@@ -3,12 +3,61 @@ import database_services.RDBService as db_service
 
 def t1():
 
+    # get_by_prefix returns at most 100 rows unless a limit is passed.
     res = db_service.get_by_prefix(
         "imdbnew", "names_basic", "primary_name", "Tom H"
     )
     print("t1 resule = ", res)
 
 
-t1()
+def t2():
+
+    res = db_service.get_by_prefix(
+        "imdbnew", "names_basic", "primary_name", "Tom H",
+        fields=["nconst", "primary_name"], limit=5
+    )
+    print("t2 result = ", res)
+    assert len(res) <= 5
+    assert all(set(r.keys()) == {"nconst", "primary_name"} for r in res)
+
+
+def t3():
+
+    try:
+        db_service.get_by_prefix(
+            "imdbnew", "names_basic", "primary_name", "Tom H",
+            fields=["nconst", "not_a_column"]
+        )
+    except ValueError as e:
+        print("t3 result = ", e)
+    else:
+        raise AssertionError("t3 expected ValueError for an unknown field")
+
 
+def t4():
+
+    batches = db_service.stream_by_prefix(
+        "imdbnew", "names_basic", "primary_name", "Tom H",
+        fields=["nconst", "primary_name"], limit=250, batch_size=100
+    )
+    count = 0
+    for rows in batches:
+        assert len(rows) <= 100
+        count += len(rows)
+    print("t4 result = ", count, "rows")
+    assert count <= 250
+
+
+def t5():
+
+    res = db_service.get_table_version("imdbnew", "names_basic")
+    print("t5 result = ", res)
+    assert res == db_service.get_table_version("imdbnew", "names_basic")
+
+
+t1()
+t2()
+t3()
+t4()
+t5()
 